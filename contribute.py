@@ -6,12 +6,17 @@ import re
 import subprocess
 import sys
 from datetime import datetime, timedelta
+from multiprocessing import Pool
 from random import randint
-from subprocess import Popen
-from typing import List, Optional
-import pandas as pd
+from subprocess import PIPE, Popen
+from typing import Iterator, List, Optional, Tuple
 import numpy as np
 
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
 # Constants
 MAX_COMMITS_PER_DAY = 20
 MIN_COMMITS_PER_DAY = 1
@@ -20,6 +25,10 @@ DEFAULT_FREQUENCY = 80
 REPOSITORY_PREFIX = 'repository-'
 README_FILENAME = 'README.md'
 MAIN_BRANCH = 'main'
+REPOSITORY_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'contribute', 'repos.json')
+REPOSITORY_CACHE_TTL = timedelta(hours=24)
+PART_REFS = 'refs/contribute/'
+SSH_URL_PATTERN = re.compile(r'git@github\.com:.+/(.+?)(?:\.git)?$')
 
 class Args:
     """
@@ -34,9 +43,13 @@ class Args:
     day_start: datetime
     day_end: datetime
     num_clusters: int
+    jobs: int
+    no_cache: bool
+    repo_info: Optional[dict]
     
     def __init__(self, no_weekends: bool, max_commits: int, frequency: int, repository: str,
-                 user_name: str, user_email: str, day_start: datetime, day_end: datetime, num_clusters: int = 1):
+                 user_name: str, user_email: str, day_start: datetime, day_end: datetime, num_clusters: int = 1,
+                 jobs: int = 1, no_cache: bool = False):
         self.no_weekends = no_weekends
         self.max_commits = max_commits
         self.frequency = frequency
@@ -46,6 +59,9 @@ class Args:
         self.day_start = day_start
         self.day_end = day_end
         self.num_clusters = num_clusters
+        self.jobs = jobs
+        self.no_cache = no_cache
+        self.repo_info = None
 
     @classmethod
     def from_argparse(cls, args: argparse.Namespace) -> 'Args':
@@ -59,21 +75,32 @@ class Args:
             repository=args.repository,
             user_name=args.user_name,
             user_email=args.user_email,
-            day_start=datetime.strptime(args.day_start, '%Y-%m-%d'),
-            day_end=datetime.strptime(args.day_end, '%Y-%m-%d') if args.day_end != 'now' else datetime.now()
+            day_start=parse_date(args.day_start),
+            day_end=parse_date(args.day_end) if args.day_end != 'now' else datetime.now(),
+            jobs=args.jobs,
+            no_cache=args.no_cache
         )
 
+def parse_date(value: str) -> datetime:
+    """
+    Parse a YYYY-MM-DD date, also accepting dates without zero padding such as 2024-1-5.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, '%Y-%m-%d')
+
 def main(def_args: List[str] = sys.argv[1:]) -> None:
     """
     Main function to generate a Git repository with fake contributions.
     """
     args = parse_arguments(def_args)
     validate_args(args)
-    directory_exists = create_repository(args)
+    directory, directory_exists = create_repository(args)
     if not directory_exists:
-        configure_git(args)
-    generate_commits(args)
-    push_to_remote(args)
+        configure_git(args, directory)
+    generate_commits(args, directory)
+    push_to_remote(args, directory)
     print('\nRepository generation ' +
           '\x1b[6;30;42mcompleted successfully\x1b[0m!')
 
@@ -98,6 +125,10 @@ def parse_arguments(argsval: List[str]) -> Args:
                         help="Start date to add commits")
     parser.add_argument('-de', '--day_end', type=str, default='now',
                         help="End date to add commits")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="Number of parallel workers creating commits (0 = one per CPU core)")
+    parser.add_argument('-nc', '--no_cache', action='store_true', default=False,
+                        help="Check that the repository exists even if it was verified recently")
     return Args.from_argparse(parser.parse_args(argsval))
 
 def validate_args(args: Args) -> None:
@@ -108,11 +139,16 @@ def validate_args(args: Args) -> None:
         print('Repository name is required', file=sys.stderr)
         raise ValueError('Repository name is required')
     else:
-        try:
-            subprocess.check_output(['gh', 'repo', 'view', args.repository])
-        except subprocess.CalledProcessError:
-            print(f"Repository {args.repository} does not exist", file=sys.stderr)
-            raise ValueError(f"Repository {args.repository} does not exist")
+        info = None if args.no_cache else cached_repository_info(args.repository)
+        if info is None:
+            try:
+                info = json.loads(subprocess.check_output(
+                    ['gh', 'repo', 'view', '--json', 'url,sshUrl,name', args.repository]).decode('utf-8'))
+            except subprocess.CalledProcessError:
+                print(f"Repository {args.repository} does not exist", file=sys.stderr)
+                raise ValueError(f"Repository {args.repository} does not exist")
+            cache_repository_info(args.repository, info)
+        args.repo_info = info
     if args.day_end < args.day_start:
         print('Start date cannot be after end date', file=sys.stderr)
         raise ValueError('Start date cannot be after end date')
@@ -121,65 +157,120 @@ def validate_args(args: Args) -> None:
         print('Start date cannot be in the future', file=sys.stderr)
         raise ValueError('Start date cannot be in the future')
             
-def create_repository(args: Args) -> str:
+def load_repository_cache() -> dict:
+    """
+    Load the cache of repositories already verified to exist and their details, keyed by repository.
+    """
+    try:
+        with open(REPOSITORY_CACHE) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def cached_repository_info(repository: str) -> Optional[dict]:
+    """
+    Return the repository details if they were fetched within the cache lifetime.
+    """
+    entry = load_repository_cache().get(repository)
+    if not isinstance(entry, dict) or 'checked' not in entry:
+        return None
+    try:
+        checked = datetime.fromtimestamp(entry['checked'])
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+    if datetime.now() - checked >= REPOSITORY_CACHE_TTL:
+        return None
+    return entry.get('info')
+
+def cache_repository_info(repository: str, info: dict) -> None:
+    """
+    Record the repository details fetched just now.
+    """
+    cache = load_repository_cache()
+    cache[repository] = {'checked': datetime.now().timestamp(), 'info': info}
+    try:
+        os.makedirs(os.path.dirname(REPOSITORY_CACHE), exist_ok=True)
+        with open(REPOSITORY_CACHE, 'w') as file:
+            json.dump(cache, file)
+    except OSError:
+        pass
+
+def create_repository(args: Args) -> Tuple[str, bool]:
     """
     Create and initialize a new Git repository.
+    Returns its absolute path and whether the directory already existed.
     """
     curr_date = datetime.now()
     if args.repository:
         directory = args.repository
     else:
         directory = f"{REPOSITORY_PREFIX}{curr_date.strftime('%Y-%m-%d-%H-%M-%S')}"
+    directory = os.path.abspath(directory)
     if os.path.exists(directory):
-        os.chdir(directory)
-        return True
+        return directory, True
     os.mkdir(directory)
-    os.chdir(directory)
-    run(['git', 'init', '-b', MAIN_BRANCH])
-    return False
+    run(['git', 'init', '-b', MAIN_BRANCH], cwd=directory)
+    return directory, False
 
 def extract_repo_name(repository: str) -> str:
     """
     Extract repository name from the given URL.
     """
-    pattern = r'git@github\.com:.+/(.+)(?:\.git)?$'
-    match = re.search(pattern, repository)
+    match = SSH_URL_PATTERN.search(repository)
     return match.group(1) if match else ''
 
-def configure_git(args: Args) -> None:
+def configure_git(args: Args, directory: str) -> None:
     """
     Configure Git user name and email if provided.
     """
     if args.user_name:
-        run(['git', 'config', 'user.name', args.user_name])
+        run(['git', 'config', 'user.name', args.user_name], cwd=directory)
     if args.user_email:
-        run(['git', 'config', 'user.email', args.user_email])
+        run(['git', 'config', 'user.email', args.user_email], cwd=directory)
 
-def generate_commits(args: Args) -> None:
+def generate_commits(args: Args, directory: str) -> None:
     """
-    Generate commits based on the specified parameters.
+    Generate commits in the repository at directory based on the specified parameters.
     """
-    start_date = args.day_start
-    end_date = args.day_end
-    max_commits = args.max_commits
+    start_date = datetime.combine(args.day_start, datetime.min.time())
+    end_date = datetime.combine(args.day_end, datetime.min.time())
+    max_commits = min(max(args.max_commits, MIN_COMMITS_PER_DAY), MAX_COMMITS_PER_DAY)
     frequency = args.frequency / 100
     
-    dates = pd.date_range(start=start_date, end=end_date)
-    
-    commit_data = [np.random.randint(0, np.random.randint(1, max_commits)) if np.random.rand() < frequency else 0 for _ in range(len(dates))]
+    dates = list(date_range(start_date, end_date))
+    n = len(dates)
+
+    rng = np.random.default_rng()
+    mask = rng.random(n) < frequency
+    if args.no_weekends:
+        mask &= np.fromiter((day.weekday() < 5 for day in dates), dtype=bool, count=n)
+    counts = np.zeros(n, dtype=np.int32)
+    counts[mask] = rng.integers(1, max_commits + 1, size=int(mask.sum()))
+
+    commits = []
+    for day, count in zip(dates, counts):
+        for m in range(count):
+            date = day + timedelta(minutes=m)
+            commits.append((date, message(date)))
+    if not commits:
+        return
 
-    df = pd.DataFrame({'date': dates, 'commits': commit_data})
-    for index, row in df.iterrows():
-        if row['commits'] > 0:
-            for n_commit in range(row['commits']):
-                create_commit(row['date'] + timedelta(minutes=n_commit))
+    readme = read_readme(directory)
+    parent = ref_tip(f'refs/heads/{MAIN_BRANCH}', directory)
+    jobs = args.jobs or os.cpu_count()
+    if jobs > 1 and len(commits) > jobs:
+        parallel_commits(directory, commits, jobs, readme, parent)
+    else:
+        write_commits(directory, commits, f'refs/heads/{MAIN_BRANCH}', readme, parent)
+    run(['git', 'reset', '--hard', MAIN_BRANCH], cwd=directory)
 
 
-def date_range(start_date: datetime, end_date: datetime) -> List[datetime]:
+def date_range(start_date: datetime, end_date: datetime) -> Iterator[datetime]:
     """
-    Generate a list of dates between start_date and end_date.
+    Lazily generate the dates between start_date and end_date.
     """
-    return [start_date + timedelta(n) for n in range((end_date - start_date).days + 1)]
+    n = (end_date - start_date).days + 1
+    return (start_date + timedelta(d) for d in range(n))
 
 def should_commit(day: datetime, no_weekends: bool, frequency: int) -> bool:
     """
@@ -194,21 +285,162 @@ def commit_times_for_day(day: datetime, args: argparse.Namespace) -> List[dateti
     num_commits = contributions_per_day(args)
     return [day + timedelta(minutes=m) for m in range(num_commits)]
 
-def create_commit(date: datetime) -> None:
+def parallel_commits(directory: str, commits: List[Tuple[datetime, str]], jobs: int, readme: bytes,
+                     parent: Optional[str]) -> None:
+    """
+    Split the commits into contiguous slices, write each slice on its own ref in a separate
+    process and join the slices into the main branch with a single octopus merge commit.
+    Every slice starts from the parent commit so it keeps the files already tracked there.
+    """
+    size = -(-len(commits) // jobs)
+    slices = [commits[i:i + size] for i in range(0, len(commits), size)]
+    tasks = []
+    content = bytearray(readme)
+    for index, chunk in enumerate(slices):
+        tasks.append((directory, chunk, f'{PART_REFS}part-{index}', bytes(content), parent))
+        content += b''.join(f"{msg}\n\n".encode() for _, msg in chunk)
+
+    # Refs left behind by an interrupted run would make fast-import refuse to update them.
+    delete_part_refs(directory)
+    try:
+        with Pool(len(tasks)) as pool:
+            tips = pool.starmap(write_commits, tasks)
+
+        # Every slice holds the parent's files and the full README up to its last commit, so the
+        # merge takes the tree of the final slice instead of letting git resolve the README conflicts.
+        commands = ['git', 'commit-tree', f'{tips[-1]}^{{tree}}', '-m', 'Merge contributions']
+        for tip in tips:
+            commands += ['-p', tip]
+        # Date the merge like the last generated commit so it does not add a contribution for today.
+        timestamp = git_date(commits[-1][0])
+        env = {**os.environ, 'GIT_AUTHOR_DATE': timestamp, 'GIT_COMMITTER_DATE': timestamp}
+        merge = subprocess.check_output(commands, cwd=directory, env=env).decode('utf-8').strip()
+        run(['git', 'update-ref', f'refs/heads/{MAIN_BRANCH}', merge], cwd=directory)
+    finally:
+        delete_part_refs(directory)
+
+def delete_part_refs(directory: str) -> None:
+    """
+    Delete the temporary refs the parallel workers write their slices to.
+    """
+    refs = subprocess.check_output(['git', 'for-each-ref', '--format=%(refname)', PART_REFS],
+                                   cwd=directory).decode('utf-8').split()
+    for ref in refs:
+        run(['git', 'update-ref', '-d', ref], cwd=directory)
+
+def write_commits(directory: str, commits: List[Tuple[datetime, str]], ref: str, readme: bytes,
+                  parent: Optional[str]) -> str:
+    """
+    Create one commit per (date, message) pair on the given ref of the repository at directory,
+    starting from the given README contents and parent commit. Returns the hash of the last commit.
+    """
+    if pygit2:
+        return pygit2_commits(directory, commits, ref, readme, parent)
+    return fast_import_commits(directory, commits, ref, readme, parent)
+
+def fast_import_commits(directory: str, commits: List[Tuple[datetime, str]], ref: str, readme: bytes,
+                        parent: Optional[str]) -> str:
+    """
+    Create one commit per (date, message) pair with a single git fast-import stream.
+    """
+    committer = committer_identity(directory)
+    readme = bytearray(readme)
+
+    process = Popen(['git', 'fast-import', '--quiet', '--date-format=raw'], stdin=PIPE, cwd=directory)
+    stream = process.stdin
+    for n, (date, msg) in enumerate(commits):
+        blob_mark, commit_mark = 2 * n + 1, 2 * n + 2
+        readme += f"{msg}\n\n".encode()
+        stream.write(f"blob\nmark :{blob_mark}\n".encode())
+        stream.write(b'data %d\n' % len(readme))
+        stream.write(readme)
+        stream.write(b'\n')
+        stream.write(f"commit {ref}\nmark :{commit_mark}\n".encode())
+        stream.write(f"committer {committer} {git_date(date)}\n".encode())
+        stream.write(fast_import_data(msg.encode()))
+        if parent:
+            stream.write(f"from {parent}\n".encode())
+        stream.write(f"M 100644 :{blob_mark} {README_FILENAME}\n\n".encode())
+        parent = f":{commit_mark}"
+    stream.close()
+    if process.wait() != 0:
+        raise RuntimeError('git fast-import failed')
+    return ref_tip(ref, directory)
+
+def pygit2_commits(directory: str, commits: List[Tuple[datetime, str]], ref: str, readme: bytes,
+                   parent: Optional[str]) -> str:
+    """
+    Create one commit per (date, message) pair by writing objects in-process with pygit2.
+    """
+    repo = pygit2.Repository(directory)
+    identity = repo.default_signature
+    readme = bytearray(readme)
+    parent = [pygit2.Oid(hex=parent)] if parent else []
+    base_tree = repo[parent[0]].tree if parent else None
+
+    for date, msg in commits:
+        readme += f"{msg}\n\n".encode()
+        blob_oid = repo.create_blob(bytes(readme))
+        tb = repo.TreeBuilder(base_tree) if base_tree else repo.TreeBuilder()
+        tb.insert(README_FILENAME, blob_oid, pygit2.GIT_FILEMODE_BLOB)
+        tree_oid = tb.write()
+        sig = pygit2.Signature(identity.name, identity.email, int(date.timestamp()), utc_offset_minutes(date))
+        commit_oid = repo.create_commit(None, sig, sig, msg, tree_oid, parent)
+        parent = [commit_oid]
+    repo.references.create(ref, parent[0], force=True)
+    return str(parent[0])
+
+def read_readme(directory: str) -> bytes:
+    """
+    Read the current README contents, or empty bytes if it does not exist yet.
+    """
+    path = os.path.join(directory, README_FILENAME)
+    if not os.path.exists(path):
+        return b''
+    with open(path, 'rb') as file:
+        return file.read()
+
+def utc_offset_minutes(date: datetime) -> int:
+    """
+    Return the local UTC offset in effect at the given local date, in minutes.
+    """
+    return int(date.astimezone().utcoffset().total_seconds() // 60)
+
+def git_date(date: datetime) -> str:
+    """
+    Format a local date in git's raw '<epoch> <+-HHMM>' form, keeping the local offset.
+    """
+    offset = utc_offset_minutes(date)
+    hours, minutes = divmod(abs(offset), 60)
+    return f"{int(date.timestamp())} {'-' if offset < 0 else '+'}{hours:02d}{minutes:02d}"
+
+def fast_import_data(content: bytes) -> bytes:
+    """
+    Encode content as a git fast-import data command.
+    """
+    return b'data %d\n%s\n' % (len(content), content)
+
+def ref_tip(ref: str, directory: str) -> Optional[str]:
+    """
+    Return the commit hash the given ref points to, or None if it does not exist.
+    """
+    result = subprocess.run(['git', 'rev-parse', '--verify', '--quiet', ref],
+                            stdout=PIPE, cwd=directory)
+    return result.stdout.decode('utf-8').strip() if result.returncode == 0 else None
+
+def committer_identity(directory: str) -> str:
     """
-    Create a single commit with the given date.
+    Return the 'Name <email>' committer identity git would use in the repository at directory,
+    honouring user.name/user.email as well as the GIT_COMMITTER_* environment variables.
     """
-    with open(README_FILENAME, 'a') as file:
-        file.write(f"{message(date)}\n\n")
-    run(['git', 'add', '.'])
-    run(['git', 'commit', '-m', f'"{message(date)}"',
-         '--date', date.strftime('"%Y-%m-%d %H:%M:%S"')])
+    ident = subprocess.check_output(['git', 'var', 'GIT_COMMITTER_IDENT'], cwd=directory).decode('utf-8')
+    return ident[:ident.rindex('>') + 1]
 
-def run(commands: List[str]) -> None:
+def run(commands: List[str], cwd: Optional[str] = None) -> None:
     """
-    Run a shell command and wait for it to complete.
+    Run a shell command and wait for it to complete, raising CalledProcessError on failure.
     """
-    Popen(commands).wait()
+    subprocess.run(commands, cwd=cwd, check=True, stdout=subprocess.DEVNULL)
 
 def message(date: datetime) -> str:
     """
@@ -223,20 +455,24 @@ def contributions_per_day(args: argparse.Namespace) -> int:
     max_commits = min(max(args.max_commits, MIN_COMMITS_PER_DAY), MAX_COMMITS_PER_DAY)
     return randint(MIN_COMMITS_PER_DAY, max_commits)
 
-def push_to_remote(args) -> None:
+def push_to_remote(args, directory: str) -> None:
     """
-    Push the generated commits to the remote repository if specified.
+    Push the generated commits of the repository at directory to the remote repository.
     """
     
     try:
-        subprocess.check_output(['git', 'remote', 'get-url', 'origin']).decode('utf-8').strip()
+        subprocess.check_output(['git', 'remote', 'get-url', 'origin'], cwd=directory).decode('utf-8').strip()
     except subprocess.CalledProcessError:
         print("Remote origin does not exist, adding...")
-        directory_url = json.loads(subprocess.check_output(['gh', 'repo', 'view', '--json', 'sshUrl', args.repository]).decode('utf-8').strip())
-        run(['git', 'remote', 'add', 'origin', directory_url['sshUrl']])
+        run(['git', 'remote', 'add', 'origin', args.repo_info['sshUrl']], cwd=directory)
         
-    run(['git', 'branch', '-M', MAIN_BRANCH])
-    run(['git', 'push', '-u', 'origin', MAIN_BRANCH])
+    run(['git', 'branch', '-M', MAIN_BRANCH], cwd=directory)
+    if not pygit2:
+        # git fast-import writes packs with only naive deltas; recompute them once using
+        # every core so the push sends a small pack.
+        run(['git', 'repack', '-adf', '--threads=0'], cwd=directory)
+    run(['git', '-c', 'pack.threads=0', '-c', 'pack.windowMemory=256m',
+         'push', '-u', 'origin', MAIN_BRANCH], cwd=directory)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
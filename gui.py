@@ -117,11 +117,11 @@ class ContributeUI(QMainWindow):
             print(args)
             os.chdir(os.path.dirname(os.path.abspath(__file__)))
             contribute.validate_args(args)
-            directory_exists = contribute.create_repository(args)
+            directory, directory_exists = contribute.create_repository(args)
             if not directory_exists:
-                contribute.configure_git(args)
-            contribute.generate_commits(args)
-            contribute.push_to_remote(args)
+                contribute.configure_git(args, directory)
+            contribute.generate_commits(args, directory)
+            contribute.push_to_remote(args, directory)
           
             self.status_label.setText("Contributions generated successfully!")
         except Exception as e:
@@ -1,6 +1,13 @@
+import json
+import os
+import shutil
+import tempfile
+import time
 import unittest
+from datetime import date, datetime, timedelta
 import contribute
 from subprocess import check_output
+from unittest import mock
 
 
 class TestContribute(unittest.TestCase):
@@ -30,3 +37,248 @@ class TestContribute(unittest.TestCase):
              '--count',
              'HEAD']
         ).decode('utf-8')) <= 20*(10 + 15))
+
+    def test_parse_dates(self):
+        args = contribute.parse_arguments(['-ds', '2024-01-05',
+                                           '-de', '2024-2-1'])
+        self.assertEqual(args.day_start, datetime(2024, 1, 5))
+        self.assertEqual(args.day_end, datetime(2024, 2, 1))
+        args = contribute.parse_arguments(['-ds', '2024-1-5'])
+        self.assertEqual(args.day_start, datetime(2024, 1, 5))
+
+    def test_extract_repo_name(self):
+        self.assertEqual(contribute.extract_repo_name(
+            'git@github.com:user/repo.git'), 'repo')
+        self.assertEqual(contribute.extract_repo_name(
+            'git@github.com:user/repo'), 'repo')
+
+    def test_repository_cache(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        cache_file = os.path.join(directory, 'repos.json')
+        self.addCleanup(mock.patch.stopall)
+        mock.patch.object(contribute, 'REPOSITORY_CACHE', cache_file).start()
+        info = {'url': 'https://github.com/user/repo',
+                'sshUrl': 'git@github.com:user/repo.git',
+                'name': 'repo'}
+        gh = mock.patch.object(
+            contribute.subprocess, 'check_output',
+            return_value=json.dumps(info).encode('utf-8')).start()
+        args = make_args(repository='user/repo',
+                         day_start=date(2024, 1, 1),
+                         day_end=date(2024, 1, 31))
+
+        contribute.validate_args(args)
+        contribute.validate_args(args)
+        self.assertEqual(gh.call_count, 1)
+        self.assertEqual(args.repo_info, info)
+
+        args.no_cache = True
+        contribute.validate_args(args)
+        self.assertEqual(gh.call_count, 2)
+
+        args.no_cache = False
+        expired = (datetime.now() - timedelta(hours=25)).timestamp()
+        for checked in (expired, 'yesterday'):
+            with open(cache_file, 'w') as file:
+                json.dump({'user/repo': {'checked': checked, 'info': info}},
+                          file)
+            self.assertIsNone(contribute.cached_repository_info('user/repo'))
+        contribute.validate_args(args)
+        self.assertEqual(gh.call_count, 3)
+        self.assertEqual(contribute.cached_repository_info('user/repo'), info)
+
+    def test_daily_commit_counts(self):
+        directory = make_repository(self)
+        args = make_args(no_weekends=True, max_commits=50,
+                         day_start=datetime(2024, 1, 1),
+                         day_end=datetime(2024, 3, 31))
+        contribute.generate_commits(args, directory)
+
+        days = {}
+        for message in git(directory, 'log', '--format=%s').splitlines():
+            day = datetime.strptime(message, 'Contribution: %Y-%m-%d %H:%M')
+            days[day.date()] = days.get(day.date(), 0) + 1
+        self.assertTrue(all(day.weekday() < 5 for day in days))
+        self.assertEqual(len(days), 65)
+        self.assertTrue(all(1 <= count <= contribute.MAX_COMMITS_PER_DAY
+                            for count in days.values()))
+
+    def test_fast_import_commits(self):
+        with mock.patch.object(contribute, 'pygit2', None):
+            self.check_generated_commits(jobs=1)
+
+    @unittest.skipUnless(contribute.pygit2, 'pygit2 is not installed')
+    def test_pygit2_commits(self):
+        self.check_generated_commits(jobs=1)
+
+    def test_parallel_fast_import_commits(self):
+        with mock.patch.object(contribute, 'pygit2', None):
+            self.check_generated_commits(jobs=4)
+
+    def check_generated_commits(self, jobs: int):
+        directory = make_repository(self)
+        for filename, content in (('README.md', '# Sample\n\n'),
+                                  ('other.txt', 'keep me\n')):
+            with open(os.path.join(directory, filename), 'w') as file:
+                file.write(content)
+        git(directory, 'add', '.')
+        git(directory, 'commit', '-q', '-m', 'Initial commit')
+
+        initial = git(directory, 'rev-parse', 'HEAD').strip()
+        contribute.generate_commits(make_args(jobs=jobs), directory)
+
+        messages = git(directory, 'log', '--no-merges', '--reverse',
+                       '--date-order', '--format=%s',
+                       f'{initial}..HEAD').splitlines()
+        self.assertTrue(31 <= len(messages) <= 31 * 5)
+        self.assertTrue(all(message.startswith('Contribution: 2024-01-')
+                            for message in messages))
+        expected = '# Sample\n\n' + ''.join(
+            f'{message}\n\n' for message in messages)
+        with open(os.path.join(directory, 'README.md')) as file:
+            self.assertEqual(file.read(), expected)
+        self.assertEqual(git(directory, 'show', 'HEAD:README.md'), expected)
+        self.assertEqual(git(directory, 'show', 'HEAD:other.txt'),
+                         'keep me\n')
+        self.assertEqual(git(directory, 'status', '--porcelain'), '')
+
+    def test_fast_import_uses_committer_environment(self):
+        directory = make_repository(self)
+        git(directory, 'config', '--unset', 'user.name')
+        git(directory, 'config', '--unset', 'user.email')
+        environment = {'GIT_CONFIG_GLOBAL': os.devnull,
+                       'GIT_CONFIG_NOSYSTEM': '1',
+                       'GIT_COMMITTER_NAME': 'Environment Name',
+                       'GIT_COMMITTER_EMAIL': 'environment@example.com'}
+        args = make_args(day_start=datetime(2024, 1, 8),
+                         day_end=datetime(2024, 1, 8))
+        with mock.patch.object(contribute, 'pygit2', None), \
+                mock.patch.dict(os.environ, environment):
+            contribute.generate_commits(args, directory)
+        self.assertEqual(
+            set(git(directory, 'log', '--format=%cn <%ce>').splitlines()),
+            {'Environment Name <environment@example.com>'})
+
+    @unittest.skipUnless(contribute.pygit2, 'pygit2 is not installed')
+    def test_pygit2_uses_configured_identity(self):
+        directory = make_repository(self)
+        args = make_args(day_start=datetime(2024, 1, 8),
+                         day_end=datetime(2024, 1, 8))
+        contribute.generate_commits(args, directory)
+        self.assertEqual(
+            set(git(directory, 'log', '--format=%an <%ae>|%cn <%ce>')
+                .splitlines()),
+            {'sampleusername <your-username@users.noreply.github.com>|'
+             'sampleusername <your-username@users.noreply.github.com>'})
+
+    def test_parallel_commits_keep_tracked_files(self):
+        directory = make_repository(self)
+        with open(os.path.join(directory, 'other.txt'), 'w') as file:
+            file.write('keep me\n')
+        git(directory, 'add', 'other.txt')
+        git(directory, 'commit', '-q', '-m', 'Add other.txt')
+
+        args = make_args(jobs=4)
+        contribute.generate_commits(args, directory)
+        files = git(directory, 'ls-tree', '--name-only', 'HEAD').split()
+        self.assertEqual(sorted(files), ['README.md', 'other.txt'])
+        self.assertTrue(os.path.exists(os.path.join(directory, 'other.txt')))
+
+    def test_parallel_commits_replace_stale_part_refs(self):
+        directory = make_repository(self)
+        empty_tree = git(directory, 'mktree', input=b'').strip()
+        stale = git(directory, 'commit-tree', empty_tree, '-m', 'Stale')
+        git(directory, 'update-ref', 'refs/contribute/part-0', stale.strip())
+
+        with mock.patch.object(contribute, 'pygit2', None):
+            contribute.generate_commits(make_args(jobs=2), directory)
+        self.assertEqual(git(directory, 'for-each-ref', 'refs/contribute/'),
+                         '')
+        self.assertEqual(git(directory, 'log', '-1', '--format=%s'),
+                         'Merge contributions\n')
+
+    def test_parallel_commits_delete_part_refs_on_failure(self):
+        directory = make_repository(self)
+        real_check_output = contribute.subprocess.check_output
+
+        def check_output_failing_merge(commands, **kwargs):
+            if 'commit-tree' in commands:
+                raise contribute.subprocess.CalledProcessError(1, commands)
+            return real_check_output(commands, **kwargs)
+        with mock.patch.object(contribute, 'pygit2', None), \
+                mock.patch.object(contribute.subprocess, 'check_output',
+                                  check_output_failing_merge):
+            with self.assertRaises(contribute.subprocess.CalledProcessError):
+                contribute.generate_commits(make_args(jobs=2), directory)
+        self.assertEqual(git(directory, 'for-each-ref', 'refs/contribute/'),
+                         '')
+
+    def test_fast_import_keeps_local_offset(self):
+        with mock.patch.object(contribute, 'pygit2', None):
+            self.check_local_offset()
+
+    @unittest.skipUnless(contribute.pygit2, 'pygit2 is not installed')
+    def test_pygit2_keeps_local_offset(self):
+        self.check_local_offset()
+
+    def check_local_offset(self):
+        use_timezone(self, 'Asia/Tokyo')
+        directory = make_repository(self)
+        args = make_args(no_weekends=True, max_commits=1,
+                         day_start=datetime(2024, 1, 8),
+                         day_end=datetime(2024, 1, 8))
+        contribute.generate_commits(args, directory)
+        self.assertEqual(
+            git(directory, 'log', '--format=%ad|%s', '--date=iso'),
+            '2024-01-08 00:00:00 +0900|Contribution: 2024-01-08 00:00\n')
+
+    def test_parallel_merge_keeps_local_offset(self):
+        use_timezone(self, 'Asia/Tokyo')
+        directory = make_repository(self)
+        args = make_args(max_commits=1, jobs=2,
+                         day_start=datetime(2024, 1, 8),
+                         day_end=datetime(2024, 1, 10))
+        contribute.generate_commits(args, directory)
+        self.assertEqual(
+            git(directory, 'log', '-1', '--format=%ad|%s', '--date=iso'),
+            '2024-01-10 00:00:00 +0900|Merge contributions\n')
+
+
+def git(directory: str, *commands: str, **kwargs) -> str:
+    return check_output(['git', *commands], cwd=directory,
+                        **kwargs).decode('utf-8')
+
+
+def use_timezone(test: unittest.TestCase, timezone: str) -> None:
+    previous = os.environ.get('TZ')
+    os.environ['TZ'] = timezone
+    time.tzset()
+
+    def restore():
+        if previous is None:
+            os.environ.pop('TZ', None)
+        else:
+            os.environ['TZ'] = previous
+        time.tzset()
+    test.addCleanup(restore)
+
+
+def make_repository(test: unittest.TestCase) -> str:
+    directory = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, directory)
+    check_output(['git', 'init', '-q', '-b', contribute.MAIN_BRANCH,
+                  directory])
+    git(directory, 'config', 'user.name', 'sampleusername')
+    git(directory, 'config', 'user.email',
+        'your-username@users.noreply.github.com')
+    return directory
+
+
+def make_args(**overrides) -> contribute.Args:
+    values = dict(no_weekends=False, max_commits=5, frequency=100,
+                  repository='sample', user_name=None, user_email=None,
+                  day_start=datetime(2024, 1, 1),
+                  day_end=datetime(2024, 1, 31))
+    values.update(overrides)
+    return contribute.Args(**values)